@@ -24,6 +24,7 @@ setup(
         "torch",
         "colorlog",
         "tqdm",
+        "orjson",
     ],
     python_requires=">=3.8",
     classifiers=[
@@ -1,4 +1,4 @@
-from .random_utils import set_seed, random_str, str2base62    
+from .random_utils import set_seed, random_str, random_token, str2base62, str2base62_batch
 from .memory_utils import _format_bytes, calculate_model_memory
 from .timing_utils import Timer
 from .plot_utils import plot_multi_features, clip_numpy, summarize_multi_stats, plot_box, plot_violin, plot_histogram
@@ -10,7 +10,9 @@ __all__ = [
     'Colors',
     'set_seed', 
     'random_str',
+    'random_token',
     'str2base62',
+    'str2base62_batch',
     '_format_bytes',
     'Timer',
     'calculate_model_memory',
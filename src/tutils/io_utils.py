@@ -1,143 +1,296 @@
+import hashlib
 import numpy as np
 import json
+import math
+import orjson
 import os
 import pandas as pd
+import pickle
+import re
 import time
+from functools import partial
+from multiprocessing import Pool
+
+# exact-type dispatch for the common numpy types, avoids an isinstance chain per value
+_HANDLERS = {
+    **{t: int for t in (np.int8, np.int16, np.int32, np.int64, np.intc, np.longlong,
+                        np.uint8, np.uint16, np.uint32, np.uint64, np.uintc, np.ulonglong)},
+    **{t: float for t in (np.float16, np.float32, np.float64, np.longdouble)},
+    np.bool_: bool,
+    np.ndarray: np.ndarray.tolist,
+}
 
 def _to_serializable(o):
-    # scalar
-    if isinstance(o, np.integer):  return int(o)
-    if isinstance(o, np.floating): return float(o)
-    if isinstance(o, np.bool_):    return bool(o)
-    # array
+    h = _HANDLERS.get(type(o))
+    if h is not None:
+        return h(o)
+    # subclasses / less common dtypes
+    if isinstance(o, np.generic):  return o.item()
     if isinstance(o, np.ndarray):  return o.tolist()
-    if o is np.nan:                return None
     return o
 
+# fdatasync skips the inode metadata flush (mtime etc.); not available on macOS/Windows
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+# orjson handles numpy arrays/scalars natively; _to_serializable is only a fallback
+_ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# ints outside the int64/uint64 range have 19+ digits; orjson would turn them into floats when parsing
+_LONG_INT = re.compile(rb'\d{19}')
+
+def _has_nonfinite(o):
+    t = type(o)
+    if t is dict:
+        return any(_has_nonfinite(v) for v in o.values())
+    if t is list or t is tuple:
+        return any(_has_nonfinite(v) for v in o)
+    if t is float or isinstance(o, np.floating):
+        return not math.isfinite(o)
+    if isinstance(o, np.ndarray):
+        return o.dtype.kind == 'f' and not np.isfinite(o).all()
+    return False
+
+def _std_dumps(item, ensure_ascii=False):
+    # stdlib json: numpy-bearing items only pay for default= after a TypeError
+    try:
+        s = json.dumps(item, ensure_ascii=ensure_ascii)
+    except TypeError:
+        s = json.dumps(item, ensure_ascii=ensure_ascii, default=_to_serializable)
+    return s.encode('utf-8')
+
+def _dumps(item, ensure_ascii=False):
+    # orjson always emits UTF-8, so escaping non-ASCII still goes through stdlib json
+    if ensure_ascii:
+        return _std_dumps(item, ensure_ascii=True)
+    try:
+        s = orjson.dumps(item, default=_to_serializable, option=_ORJSON_OPTS)
+    except TypeError:
+        # e.g. ints >= 2**64, which orjson rejects but stdlib json handles
+        return _std_dumps(item)
+    # orjson writes NaN/Infinity as null; only records containing a null need the scan
+    if b'null' in s and _has_nonfinite(item):
+        return _std_dumps(item)
+    return s
+
+def _loads(line):
+    if _LONG_INT.search(line) is None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN/Infinity tokens written by stdlib json
+    return json.loads(line)
+
 def load_jsonl(path):
-    data = []
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                data.append(json.loads(line))
-    return data
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return [_loads(line) for line in raw.splitlines() if line.strip()]
 
 def dump_jsonl(path, data_list, ensure_ascii=False):
-    with open(path, 'w', encoding='utf-8') as f:
+    with open(path, 'wb') as f:
         for item in data_list:
-            f.write(json.dumps(item, ensure_ascii=ensure_ascii, default=_to_serializable) + '\n')
+            f.write(_dumps(item, ensure_ascii) + b'\n')
     print(f"save {len(data_list)} data to {path}")
 
 def append_jsonl(path, data, ensure_ascii=False):
     assert isinstance(data, list), "data must be a list"
-    with open(path, 'a', encoding='utf-8') as f:
+    with open(path, 'ab') as f:
         for item in data:
-            f.write(json.dumps(item, ensure_ascii=ensure_ascii, default=_to_serializable) + "\n")
+            f.write(_dumps(item, ensure_ascii) + b"\n")
     print(f"append {len(data)} data to {path}")
     
 def save_df(dataframe, path, index=True):
-    dataframe.to_csv(path, index=index)
+    if str(path).endswith('.parquet'):
+        dataframe.to_parquet(path, index=index)
+    else:
+        dataframe.to_csv(path, index=index)
     return path
 
-def load_df(path):
-    return pd.read_csv(path)
+def load_df(path, engine=None):
+    # engine='pyarrow' gives the multi-threaded Arrow CSV reader (dtypes/index naming may differ)
+    if str(path).endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, engine=engine)
         
 
+def _parse_and_transform(transform_func, line):
+    # runs in worker processes: parse + transform + serialize, errors are reported back
+    try:
+        result = transform_func(_loads(line))
+        if result is None:
+            return None, None
+        return _dumps(result) + b'\n', None
+    except Exception as e:
+        return None, str(e)
+
+
+def _const_repr(c):
+    # set literals are folded into frozenset constants whose repr order depends on PYTHONHASHSEED
+    if isinstance(c, (frozenset, set)):
+        return f"{type(c).__name__}({sorted(map(_const_repr, c))})"
+    if isinstance(c, tuple):
+        return f"({','.join(map(_const_repr, c))})"
+    return repr(c)
+
+def _code_digest(code, h):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for c in code.co_consts:
+        # nested functions/comprehensions: hash their code, not their address-bearing repr
+        if hasattr(c, 'co_code'):
+            _code_digest(c, h)
+        else:
+            h.update(_const_repr(c).encode())
+
+def _func_fingerprint(func):
+    # identifies the transform across runs so an edited function doesn't resume an old run
+    parts = []
+    while isinstance(func, partial):
+        parts.append(repr((func.args, func.keywords)))
+        func = func.func
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        h = hashlib.blake2b(digest_size=8)
+        _code_digest(code, h)
+        parts.append(h.hexdigest())
+    parts.append(f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', type(func).__qualname__)}")
+    return '|'.join(parts)
 
-def transform_jsonl(file_path, transform_func, interval=60):
+
+def transform_jsonl(file_path, transform_func, interval=60, num_workers=1, chunksize=1024):
     """
-    Transform a jsonl file in-place with periodic atomic saves for crash safety.
+    Transform a jsonl file in-place with periodic checkpoints for crash safety.
     
     Args:
         file_path: path to the jsonl file (read and rewrite the same file)
         transform_func: function that takes a dict and returns a dict; return None to drop a record.
-        interval: auto-save interval in seconds, default 60s.
+        interval: checkpoint interval in seconds, default 60s.
+        num_workers: number of worker processes; 1 runs in the current process.
+            Falls back to 1 if `transform_func` cannot be pickled (e.g. a lambda).
+        chunksize: lines handed to a worker at a time when num_workers > 1.
     
     How it works:
         1. Load all data into memory.
-        2. During processing, every `interval` seconds atomically write processed data back.
-        3. Use a temporary file + os.replace() to guarantee atomicity.
-        4. If interrupted, already processed data stays safely written.
+        2. Processed records are appended to `<file_path>.tmp`; every `interval` seconds it is
+           fsync'ed and the number of consumed lines is recorded in `<file_path>.ckpt`.
+        3. When done (or interrupted), the untouched tail is appended and the temp file
+           atomically replaces the source via os.replace().
+        4. If the process dies before that, the source file is unchanged and the next call
+           resumes from the last checkpoint, provided the source file (size, mtime) and
+           `transform_func` (its code) are unchanged; otherwise it starts from scratch.
+           Delete `<file_path>.ckpt` to force a fresh start.
     """
-    import tempfile
-    
     # 1. Read all data into memory
     print(f"Start reading file: {file_path}")
     all_lines = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            all_lines = [line.strip() for line in f if line.strip()]
+        st = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        # keep lines as bytes: orjson parses them directly and the tail is written back verbatim
+        all_lines = [line.strip() for line in raw.splitlines() if line.strip()]
+        del raw
     except FileNotFoundError:
         print(f"File not found: {file_path}")
         return
     
     print(f"Loaded {len(all_lines)} lines")
     
-    # 2. Process data
-    processed_results = []
-    buffer = []
-    last_save_time = time.time()
     temp_path = file_path + '.tmp'
-    
-    # internal helper function: atomic save to source file
-    def atomic_save_to_source(items):
-        if not items: return
+    ckpt_path = file_path + '.ckpt'
+
+    # the checkpoint is only valid for this exact source file and transform
+    run_id = {"source": [st.st_size, st.st_mtime_ns], "func": _func_fingerprint(transform_func)}
+
+    # 2. Resume from a previous crashed run if a matching checkpoint exists
+    start = 0
+    if os.path.exists(ckpt_path) and os.path.exists(temp_path):
         try:
-            # write to temporary file
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                for item in items:
-                    f.write(json.dumps(item, ensure_ascii=False) + '\n')
-                f.flush()
-                os.fsync(f.fileno())
-            
-            # atomic replace
-            os.replace(temp_path, file_path)
-            # print(f"[{time.strftime('%H:%M:%S')}] auto save triggered: {len(items)} data atomic written to source file")
+            with open(ckpt_path, 'rb') as f:
+                ckpt = orjson.loads(f.read())
+            if any(ckpt.get(k) != v for k, v in run_id.items()) or ckpt["consumed"] > len(all_lines):
+                print("Checkpoint belongs to a different source file or transform_func, start from scratch")
+            elif os.path.getsize(temp_path) < ckpt["size"]:
+                # truncate() would pad the missing part with NUL bytes
+                print("Temp file is shorter than the checkpoint, start from scratch")
+            else:
+                # drop anything written after the last checkpoint
+                with open(temp_path, 'r+b') as f:
+                    f.truncate(ckpt["size"])
+                start = ckpt["consumed"]
+                print(f"Resume from checkpoint: {start} / {len(all_lines)} lines already processed")
         except Exception as e:
-            print(f"✗ save failed: {e}")
+            print(f"✗ invalid checkpoint ({e}), start from scratch")
+            start = 0
+    out = open(temp_path, 'ab' if start else 'wb')
+
+    def save_checkpoint(consumed):
+        out.flush()
+        _fdatasync(out.fileno())
+        with open(ckpt_path + '.tmp', 'wb') as f:
+            f.write(orjson.dumps({"consumed": consumed, "size": out.tell(), **run_id}))
+        os.replace(ckpt_path + '.tmp', ckpt_path)
 
+    # 3. Process data
+    worker = partial(_parse_and_transform, transform_func)
+    pool = None
+    if num_workers > 1:
+        try:
+            pickle.dumps(transform_func)
+            pool = Pool(num_workers)
+        except Exception as e:
+            print(f"transform_func is not picklable ({e}), fall back to sequential processing")
+    todo = all_lines[start:]
+    results = pool.imap(worker, todo, chunksize=chunksize) if pool else map(worker, todo)
+
+    consumed = start
+    last_save_time = time.time()
     try:
-        for idx, line in enumerate(all_lines, 1):
-            try:
-                raw_data = json.loads(line)
-                
-                # execute processing logic
-                result = transform_func(raw_data)
-                
-                if result is not None:
-                    buffer.append(result)
-                    
-            except Exception as e:
-                print(f"error (line {idx}): {e}, skip this line")
+        # results are already serialized, newline-terminated bytes
+        for idx, (result, error) in enumerate(results, start + 1):
+            consumed = idx
+            if error is not None:
+                print(f"error (line {idx}): {error}, skip this line")
                 continue
 
+            if result is not None:
+                out.write(result)
+
             # check time: whether the interval is exceeded
             if time.time() - last_save_time >= interval:
-                # add buffer to processed results
-                processed_results.extend(buffer)
-                buffer = []
-                processed_num = len(processed_results)
-                print(f"[{time.strftime('%H:%M:%S')}] auto-saving processed {processed_num} / {len(all_lines)} records to source file...")
-                atomic_save_to_source(processed_results+all_lines[processed_num:])
+                print(f"[{time.strftime('%H:%M:%S')}] checkpoint: processed {consumed} / {len(all_lines)} lines")
+                save_checkpoint(consumed)
                 last_save_time = time.time()
 
     except KeyboardInterrupt:
         print("... KeyboardInterrupt ...")
         
     finally:
-        processed_results.extend(buffer)
-        processed_num = len(processed_results)
-        print(f"[{time.strftime('%H:%M:%S')}] saving {processed_num} records to source file...")
-        
-        if buffer:
-            atomic_save_to_source(processed_results+all_lines[processed_num:])
-            print(f"Done, source file updated: {file_path}")
-        else:
+        if pool is not None:
+            pool.terminate()
+
+        if consumed == 0:
+            out.close()
+            os.remove(temp_path)
+            if os.path.exists(ckpt_path):
+                os.remove(ckpt_path)
             print("done (no data to save).")
-        
-        # clean up temp file if it exists
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
\ No newline at end of file
+            return
+
+        print(f"[{time.strftime('%H:%M:%S')}] saving {consumed} processed lines to source file...")
+        try:
+            # unprocessed lines are copied back verbatim in one write
+            tail = all_lines[consumed:]
+            if tail:
+                out.write(b'\n'.join(tail) + b'\n')
+            out.flush()
+            _fdatasync(out.fileno())
+            out.close()
+            # drop the checkpoint first: a crash after the replace must not leave a stale one
+            if os.path.exists(ckpt_path):
+                os.remove(ckpt_path)
+            # atomic replace
+            os.replace(temp_path, file_path)
+            print(f"Done, source file updated: {file_path}")
+        except Exception as e:
+            out.close()
+            print(f"✗ save failed: {e}")
@@ -1,10 +1,122 @@
+import importlib.util
+import math
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-def topk_matrix(a, k: int) -> List[Tuple[int, int]]:
+# numba is only looked up here; importing it and loading/compiling the kernel waits for the
+# first maxp_matrix call large enough to use it
+_HAS_NUMBA = importlib.util.find_spec('numba') is not None
+# measured: below ~8M elements the NumPy path is as fast, so the JIT cost never pays off
+_NUMBA_MIN_SIZE = 1 << 23
+_maxp_kernel = None
+
+def _get_maxp_kernel():
+    """Import numba and JIT the maxp kernel on first use; None if numba fails to import."""
+    global _maxp_kernel, _HAS_NUMBA
+    if _maxp_kernel is not None:
+        return _maxp_kernel
+    try:
+        from numba import njit, prange
+    except ImportError:
+        _HAS_NUMBA = False
+        return None
+
+    @njit(parallel=True, cache=True)
+    def kernel(A, percent):
+        """
+        Fused nanmax + threshold + gather for maxp_matrix.
+        Returns (rows, cols, vals) of finite entries > max(A) * percent, in row-major order.
+        """
+        R, C = A.shape
+        # pass 1: NaN-ignoring max per row (NaN comparisons are False), in A's dtype
+        row_max = np.empty(R, dtype=A.dtype)
+        for i in prange(R):
+            m = -np.inf
+            for j in range(C):
+                if A[i, j] > m:
+                    m = A[i, j]
+            row_max[i] = m
+        maxv = row_max.max()
+        if maxv == -np.inf:
+            # all NaN / -inf: no finite entry can pass the threshold
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, A.dtype)
+        thr = maxv * percent  # percent is passed in A's dtype, so thr stays in it too
+
+        # pass 2: count matches per row to size the outputs exactly
+        counts = np.zeros(R, np.int64)
+        for i in prange(R):
+            c = 0
+            for j in range(C):
+                v = A[i, j]
+                if np.isfinite(v) and v > thr:
+                    c += 1
+            counts[i] = c
+        offsets = np.zeros(R + 1, np.int64)
+        offsets[1:] = np.cumsum(counts)
+
+        # pass 3: fill each row's slice
+        total = offsets[R]
+        rows = np.empty(total, np.int64)
+        cols = np.empty(total, np.int64)
+        vals = np.empty(total, A.dtype)
+        for i in prange(R):
+            k = offsets[i]
+            for j in range(C):
+                v = A[i, j]
+                if np.isfinite(v) and v > thr:
+                    rows[k] = i
+                    cols[k] = j
+                    vals[k] = v
+                    k += 1
+        return rows, cols, vals
+
+    _maxp_kernel = kernel
+    return kernel
+
+def _topk_indices(flat: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the top-k entries of a 1D array, sorted by value descending."""
+    n = flat.size
+    # find top-k indices (unsorted)
+    idx_part = np.argpartition(flat, n - k)[-k:]
+    # sort by value descending (only the k gathered values)
+    vals = flat[idx_part]
+    return idx_part[np.argsort(vals)[::-1]]
+
+def _topk_indices_approx(flat: np.ndarray, k: int, k_prime: int, chunk_size: int) -> np.ndarray:
+    """
+    Two-stage approximate top-k: keep the top-k' of every full chunk (plus the whole
+    trailing partial chunk), then run the exact top-k over the surviving candidates.
+    Always returns k indices; an element of the true top-k is missed only when more
+    than k' of the true top-k fall into the same full chunk.
+    """
+    n = flat.size
+    num_chunks = n // chunk_size              # full chunks; caller guarantees n > chunk_size
+    n_full = num_chunks * chunk_size
+    # enough survivors from the full chunks alone to always return k results
+    k_prime = min(max(k_prime, math.ceil(k / num_chunks)), chunk_size)
+
+    # stage 1: per-chunk top-k' (unsorted), mapped back to flat indices
+    blocks = flat[:n_full].reshape(num_chunks, chunk_size)
+    local = np.argpartition(blocks, chunk_size - k_prime, axis=1)[:, -k_prime:]
+    cand = (local + (np.arange(num_chunks) * chunk_size)[:, None]).ravel()
+    # the trailing partial chunk is smaller than one chunk: keep all of it
+    cand = np.concatenate([cand, np.arange(n_full, n)])
+
+    # stage 2: exact top-k over the candidates
+    return cand[_topk_indices(flat[cand], k)]
+
+def topk_matrix(a, k: int, approximate: bool = False, k_prime: int = 2,
+                chunk_size: int = 65536) -> List[Tuple[int, int]]:
     """
     Return coordinates of the top-k elements in matrix `a` as [(row, col), ...].
     Results are sorted by value descending.
+
+    With approximate=True, the flattened matrix is split into chunks of `chunk_size`,
+    the top-`k_prime` of each chunk are kept and the exact top-k is taken over those
+    survivors. Each pass stays cache-sized. Exactly k coordinates are still returned,
+    but a true top-k element can be missed when more than `k_prime` of the top-k sit
+    in the same chunk (k_prime is raised to at least ceil(k / num_chunks)); raise
+    `k_prime` for higher recall, k_prime >= k makes the result exact.
     """
     A = np.asarray(a)                     # support list/np.array
     if A.ndim != 2:
@@ -15,20 +127,22 @@ def topk_matrix(a, k: int) -> List[Tuple[int, int]]:
     k = min(k, n)
 
     flat = A.ravel()
-    # find top-k indices (unsorted)
-    idx_part = np.argpartition(flat, n - k)[-k:]
-    # sort by value descending
-    idx_sorted = idx_part[np.argsort(flat[idx_part])[::-1]]
+    if approximate and n > chunk_size:
+        idx_sorted = _topk_indices_approx(flat, k, k_prime, chunk_size)
+    else:
+        idx_sorted = _topk_indices(flat, k)
     # convert to 2D coordinates
     rows, cols = np.unravel_index(idx_sorted, A.shape)
 
-    return [(int(r), int(c)) for r, c in zip(rows, cols)]
+    return list(zip(rows.tolist(), cols.tolist()))
 
-def maxp_matrix(a, percent: float) -> List[Tuple[int, int]]:
+def maxp_matrix(a, percent: float, max_return: Optional[int] = None) -> List[Tuple[int, int]]:
     """
     Return coordinates where A[i,j] > max(A) * percent.
     Results are [(row, col), ...], sorted by value descending.
     NaN values are ignored via nanmax.
+    If `max_return` is given, only the largest `max_return` matches are returned,
+    ordered via argpartition instead of a full sort.
     """
     A = np.asarray(a)
     if A.ndim != 2:
@@ -36,18 +150,38 @@ def maxp_matrix(a, percent: float) -> List[Tuple[int, int]]:
     if not np.isfinite(percent):
         raise ValueError("percent must be finite")
 
-    maxv = np.nanmax(A)
-    thr = maxv * percent
+    if np.issubdtype(A.dtype, np.floating):
+        # threshold in A's precision on both paths (float32 input -> float32 thr)
+        percent = A.dtype.type(percent)
 
-    # filter finite values above threshold
-    valid = np.isfinite(A)
-    mask = valid & (A > thr)
+    kernel = None
+    if _HAS_NUMBA and A.size and A.size >= _NUMBA_MIN_SIZE and A.dtype in (np.float32, np.float64):
+        kernel = _get_maxp_kernel()
+    if kernel is not None:
+        rows, cols, vals = kernel(A, percent)
+        if rows.size == 0:
+            return []
+    else:
+        maxv = np.nanmax(A)
+        thr = maxv * percent
 
-    if not np.any(mask):
-        return []
+        # filter finite values above threshold; NaN/-inf never compare greater,
+        # so the isfinite pass is only needed when +inf is present
+        mask = A > thr
+        if not np.isfinite(maxv):
+            mask &= np.isfinite(A)
+
+        if not np.any(mask):
+            return []
 
-    rows, cols = np.where(mask)
-    order = np.argsort(A[rows, cols])[::-1]  # sort by value descending
+        rows, cols = np.where(mask)
+        vals = A[rows, cols]
+    if max_return is not None and max_return < vals.size:
+        if max_return <= 0:
+            return []
+        order = _topk_indices(vals, max_return)
+    else:
+        order = np.argsort(vals)[::-1]  # sort by value descending
 
     rows, cols = rows[order], cols[order]
-    return [(int(r), int(c)) for r, c in zip(rows, cols)]
\ No newline at end of file
+    return list(zip(rows.tolist(), cols.tolist()))
\ No newline at end of file
@@ -13,29 +13,33 @@ def calculate_model_memory(model, include_buffers=True, include_grads=False, by_
     Print parameter memory usage of a model. Units include bytes of tensors only.
     This does NOT include optimizer states or CUDA allocator overhead.
     """
-    def tensor_bytes(t):
-        return t.nelement() * t.element_size()
-
     per_dev = defaultdict(lambda: {"params":0, "grads":0, "buffers":0})
     trainable, frozen = 0, 0
 
+    # str(device) allocates a new string each call; resolve each device once
+    dev_names = {}
+    def dev_stats(device):
+        name = dev_names.get(device)
+        if name is None:
+            name = dev_names[device] = str(device)
+        return per_dev[name]
+
     # parameters
     for p in model.parameters():
-        dev = str(p.device)
-        per_dev[dev]["params"] += tensor_bytes(p)
-        (trainable if p.requires_grad else frozen)  # just to count
+        d = dev_stats(p.device)
+        numel = p.numel()
+        d["params"] += numel * p.element_size()
         if p.requires_grad:
-            trainable += p.numel()
+            trainable += numel
             if include_grads and p.grad is not None:
-                per_dev[dev]["grads"] += tensor_bytes(p.grad)
+                d["grads"] += p.grad.numel() * p.grad.element_size()
         else:
-            frozen += p.numel()
+            frozen += numel
 
     # buffers (e.g., running stats)
     if include_buffers:
         for b in model.buffers():
-            dev = str(b.device)
-            per_dev[dev]["buffers"] += tensor_bytes(b)
+            dev_stats(b.device)["buffers"] += b.numel() * b.element_size()
 
     # totals
     total = {"params":0, "grads":0, "buffers":0}
@@ -8,26 +8,32 @@ from pathlib import Path
 from typing import Optional, Union
 import math
 
-def _to_numpy(x):
+def _to_numpy(x, dtype=np.float32):
+    # plotting/statistics don't need float64; dtype=None keeps the input dtype
     if hasattr(x, 'detach'):  # torch.Tensor
-        return x.detach().cpu().numpy()
-    return np.asarray(x)
-
-def clip_numpy(data, lo_percent=None, hi_percent=None):
-    data = _to_numpy(data)
-    if lo_percent is not None:
-        lo = np.nanpercentile(data, lo_percent)
-        data = np.clip(data, lo, data.max())
-    if hi_percent is not None:
-        hi = np.nanpercentile(data, hi_percent)
-        data = np.clip(data, data.min(), hi)
-    return data
+        import torch
+        x = x.detach().cpu()
+        if x.dtype == torch.bfloat16:  # no numpy equivalent
+            x = x.float()
+        x = x.numpy()
+    return np.asarray(x) if dtype is None else np.asarray(x, dtype=dtype)
+
+def clip_numpy(data, lo_percent=None, hi_percent=None, dtype=np.float32):
+    data = _to_numpy(data, dtype)
+    if lo_percent is None and hi_percent is None:
+        return data
+    # NaN-safe bounds; a None bound leaves that side unclipped
+    lo = np.nanpercentile(data, lo_percent) if lo_percent is not None else None
+    hi = np.nanpercentile(data, hi_percent) if hi_percent is not None else None
+    return np.clip(data, lo, hi)
 
 def _plot(
     fig: Figure,
     fig_name: str,
     out_dir: Optional[Union[str, Path]] = None,
     show: bool = False,
+    dpi: Optional[float] = None,
+    tight_bbox: bool = False,
 ) -> Optional[Path]:
     """
     save / show a Figure, and close it safely in the end.
@@ -37,6 +43,8 @@ def _plot(
         fig_name: file name (e.g. 'histogram_100.png').
         out_dir: save directory; if None, not saved, only show when show=True.
         show: whether to show on screen.
+        dpi: save resolution; if None, use the figure's own dpi.
+        tight_bbox: crop to bbox_inches="tight" (costs an extra layout pass on save).
 
     Returns:
         save path (Path), None if not saved.
@@ -49,7 +57,7 @@ def _plot(
         save_path = out_dir / fig_name
 
     if save_path is not None:
-        fig.savefig(save_path, bbox_inches="tight")
+        fig.savefig(save_path, dpi=dpi, bbox_inches="tight" if tight_bbox else None)
 
     if show:
         plt.show()
@@ -58,33 +66,33 @@ def _plot(
 
     return save_path
 
-def summarize_multi_stats(arr2d: np.ndarray):
+def summarize_multi_stats(arr2d: np.ndarray, dtype=np.float32):
+    arr2d = _to_numpy(arr2d, dtype)
     rows, cols = arr2d.shape
+    # one vectorized reduction per statistic over all rows
+    p1, p25, p50, p75, p99 = np.nanpercentile(arr2d, [1, 25, 50, 75, 99], axis=1)
     stats = {
-        "layer": [], "mean": [], "std": [], "min": [], "p1": [], "p25": [], "p50": [], "p75": [], "p99": [], "max": []
+        "layer": np.arange(rows),
+        "mean": np.nanmean(arr2d, axis=1),
+        "std": np.nanstd(arr2d, axis=1),
+        "min": np.nanmin(arr2d, axis=1),
+        "p1": p1, "p25": p25, "p50": p50, "p75": p75, "p99": p99,
+        "max": np.nanmax(arr2d, axis=1),
     }
-    for i in range(rows):
-        row = arr2d[i]
-        stats["layer"].append(i)
-        stats["mean"].append(float(np.nanmean(row)))
-        stats["std"].append(float(np.nanstd(row)))
-        stats["min"].append(float(np.nanmin(row)))
-        stats["p1"].append(float(np.nanpercentile(row, 1)))
-        stats["p25"].append(float(np.nanpercentile(row, 25)))
-        stats["p50"].append(float(np.nanpercentile(row, 50)))
-        stats["p75"].append(float(np.nanpercentile(row, 75)))
-        stats["p99"].append(float(np.nanpercentile(row, 99)))
-        stats["max"].append(float(np.nanmax(row)))
     return pd.DataFrame(stats)
 
 
 def plot_box(
     data,
     out_dir=None,
-    show=True):
+    show=True,
+    dpi=120,
+    tight_bbox=False):
     """
     Args:
         data: (distribution, values)
+        dpi: figure resolution
+        tight_bbox: save with bbox_inches="tight"
     visualize boxplot for each distribution
     """
     arr = _to_numpy(data)
@@ -100,7 +108,7 @@ def plot_box(
         out_dir = Path(out_dir)
         out_dir.mkdir(parents=True, exist_ok=True)
 
-    fig, ax = plt.subplots(figsize=(14, 6), dpi=240)
+    fig, ax = plt.subplots(figsize=(14, 6), dpi=dpi)
 
     ax.boxplot(arr.T, showmeans=True)
 
@@ -110,16 +118,20 @@ def plot_box(
 
     fig.tight_layout()
 
-    path = _plot(fig, "boxplot.png", out_dir=out_dir, show=show)
+    path = _plot(fig, "boxplot.png", out_dir=out_dir, show=show, dpi=dpi, tight_bbox=tight_bbox)
     return path
 
 def plot_violin(
     data,
     out_dir=None,
-    show=True):
+    show=True,
+    dpi=120,
+    tight_bbox=False):
     """
     Args:
         data: (distribution, values)
+        dpi: figure resolution
+        tight_bbox: save with bbox_inches="tight"
     """
     arr = _to_numpy(data)
 
@@ -134,7 +146,7 @@ def plot_violin(
         out_dir = Path(out_dir)
         out_dir.mkdir(parents=True, exist_ok=True)
 
-    fig, ax = plt.subplots(figsize=(14, 6), dpi=240)
+    fig, ax = plt.subplots(figsize=(14, 6), dpi=dpi)
 
     ax.violinplot(arr.T, showmeans=False, showmedians=True)
 
@@ -144,7 +156,7 @@ def plot_violin(
 
     fig.tight_layout()
 
-    path = _plot(fig, "violin.png", out_dir=out_dir, show=show)
+    path = _plot(fig, "violin.png", out_dir=out_dir, show=show, dpi=dpi, tight_bbox=tight_bbox)
     return path
 
 
@@ -153,12 +165,16 @@ def plot_histogram(
     bins=100,
     density=True,
     out_dir=None,
-    show=True):
+    show=True,
+    dpi=120,
+    tight_bbox=False):
     """
     Args:
         data: array shaped (distribution, values); each row is one distribution
         bins: histogram bins
         density: normalize or not
+        dpi: figure resolution
+        tight_bbox: save with bbox_inches="tight"
     """
     arr = _to_numpy(data)
 
@@ -175,22 +191,19 @@ def plot_histogram(
     fig, ax = plt.subplots(
         num_distribution, 1,
         figsize=(14, 3 * num_distribution),
-        dpi=240,
+        dpi=dpi,
         sharex=True
     )
 
     if num_distribution == 1:
         ax = [ax]
 
-    # pre compute global y max for unified scale
-    ys = []
-    for i in range(num_distribution):
-        c, _ = np.histogram(arr[i], bins=bins, density=density)
-        ys.append(c.max())
-    ymax = max(ys)
+    # compute each histogram once; reused for the global y max and for drawing
+    hists = [np.histogram(arr[i], bins=bins, density=density) for i in range(num_distribution)]
+    ymax = max(c.max() for c, _ in hists)
 
-    for i in range(num_distribution):
-        ax[i].hist(arr[i], bins=bins, density=density)
+    for i, (counts, edges) in enumerate(hists):
+        ax[i].bar(edges[:-1], counts, width=np.diff(edges), align="edge")
         ax[i].set_ylabel("Density" if density else "Count")
         ax[i].set_title(f"Histogram [{i}] ({num_values} values)")
         ax[i].set_ylim(0, ymax)
@@ -199,7 +212,7 @@ def plot_histogram(
 
     fig.tight_layout()
 
-    path = _plot(fig, "histogram.png", out_dir=out_dir, show=show)
+    path = _plot(fig, "histogram.png", out_dir=out_dir, show=show, dpi=dpi, tight_bbox=tight_bbox)
     return path
 
 def plot_multi_features(
@@ -207,29 +220,26 @@ def plot_multi_features(
     rows_per_feature=16,
     out_dir=None,
     fname="multi_features.png",
-    show=True
+    show=True,
+    dpi=120,
+    tight_bbox=False,
 ):
     """
     Args:
         data: (layers, features)
         rows_per_feature: how many row chunks per layer
+        dpi: figure resolution
+        tight_bbox: save with bbox_inches="tight"
     """
     arr = _to_numpy(data)
     layers, feats = arr.shape
 
     # --- split to (layers*rows_per_feature, chunk) with NaN padding ---
     chunk = max(1, math.ceil(feats / rows_per_feature))
-    parts = []
-    for L in range(layers):
-        r = arr[L]
-        for i in range(rows_per_feature):
-            seg = r[i * chunk:(i + 1) * chunk]
-            if seg.size < chunk:
-                pad = np.full(chunk - seg.size, np.nan, dtype=r.dtype)
-                seg = np.concatenate([seg, pad])
-            parts.append(seg)
-
-    M = np.stack(parts, axis=0)               # (rows, cols)
+    dtype = arr.dtype if np.issubdtype(arr.dtype, np.floating) else np.float64
+    padded = np.full((layers, rows_per_feature * chunk), np.nan, dtype=dtype)
+    padded[:, :feats] = arr
+    M = padded.reshape(layers * rows_per_feature, chunk)   # (rows, cols)
     M = np.ma.masked_invalid(M)
 
     if out_dir is not None:
@@ -246,9 +256,10 @@ def plot_multi_features(
     cbar_extra = 0.6                           # extra width for colorbar (inch)
     fig_w += cbar_extra
 
-    fig, ax = plt.subplots(figsize=(fig_w, fig_h), dpi=200, constrained_layout=True)
+    fig, ax = plt.subplots(figsize=(fig_w, fig_h), dpi=dpi, constrained_layout=True)
 
     im = ax.imshow(M, interpolation='nearest')
+    im.set_rasterized(True)
     ax.set_xlabel("Neuron segment")
     ax.set_ylabel("Layer x segment rows")
 
@@ -268,7 +279,7 @@ def plot_multi_features(
     # colorbar with small fraction to reduce impact on main plot width
     fig.colorbar(im, ax=ax, fraction=0.025, pad=0.015)
 
-    path = _plot(fig, fname, out_dir=out_dir, show=show)
+    path = _plot(fig, fname, out_dir=out_dir, show=show, dpi=dpi, tight_bbox=tight_bbox)
     return path
 
 if __name__ == "__main__":
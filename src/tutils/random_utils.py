@@ -1,35 +1,162 @@
+import hashlib
+import importlib.util
+import os
+import random
+import string
+from typing import Iterable, List
+
+import numpy as np
+
+try:
+    import torch
+    _HAS_TORCH = True
+except ImportError:
+    torch = None
+    _HAS_TORCH = False
+
+# numba is only looked up here; importing it costs ~0.25 s, so that waits for the first batch call
+_HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+BASE62 = string.ascii_letters + string.digits   # 26 + 26 + 10 = 62
+_BASE62_B = BASE62.encode('ascii')
+_choices = random.choices
+# r in [0, 62**2) -> its two base62 digits, least significant first
+_BASE62_PAIRS = [bytes((_BASE62_B[r % 62], _BASE62_B[r // 62])) for r in range(62 * 62)]
+# byte -> base62 char; bytes >= 248 (= 4 * 62) are rejected so every char is equally likely
+_TOKEN_TABLE = bytes(_BASE62_B[b % 62] for b in range(256))
+_TOKEN_REJECT = bytes(range(248, 256))
+
+
+_LAST_SEED_STATE = None  # (seed, deterministic) of the last set_seed call
+
 def set_seed(seed: int = 42, deterministic: bool = False):
-    import os, random, numpy as np
-    os.environ["PYTHONHASHSEED"] = str(seed)
+    global _LAST_SEED_STATE
+    # generators are always reseeded: callers rely on set_seed to restart the streams
     random.seed(seed); np.random.seed(seed)
-    try: import torch
-    except ImportError: return
-    torch.manual_seed(seed); torch.cuda.manual_seed_all(seed)
+    if _HAS_TORCH: torch.manual_seed(seed)
+    # process-wide settings below only change when (seed, deterministic) does
+    key = (seed, deterministic)
+    if _LAST_SEED_STATE == key: return
+    _LAST_SEED_STATE = key
+    os.environ["PYTHONHASHSEED"] = str(seed)
+    # CPU-only hosts: avoid touching CUDA / cuDNN state at all
+    if not _HAS_TORCH or not torch.cuda.is_available(): return
+    torch.cuda.manual_seed_all(seed)
     torch.backends.cudnn.deterministic = deterministic
     torch.backends.cudnn.benchmark = not deterministic
 
 
 def random_str(length=5):
-    import random, string
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
+    # one C-level loop instead of a random.choice call per character
+    return ''.join(_choices(BASE62, k=length))
 
 
-import hashlib
-import string
+def random_token(length=22):
+    """
+    Cryptographically secure base62 string (the source `secrets` builds on: os.urandom).
+    Unlike random_str it is not affected by set_seed.
+    """
+    out = b''
+    while len(out) < length:
+        # ~3% of bytes are rejected; draw a little extra to usually finish in one round
+        out += os.urandom(length - len(out) + 8).translate(_TOKEN_TABLE, _TOKEN_REJECT)
+    return out[:length].decode('ascii')
 
-BASE62 = string.ascii_letters + string.digits   # 26 + 26 + 10 = 62
+
+# fixed digest size: BLAKE2b mixes digest_size into the hash, so it must not depend on `length`
+# (the same number is used for every length, shorter ids are prefixes of longer ones)
+_B62_DIGEST_SIZE = 32
 
 def str2base62(s: str, length: int = 8) -> str:
-    # use SHA-256 for hashing to make the mapping deterministic
-    h = hashlib.sha256(s.encode()).digest()   # bytes
+    # BLAKE2b (stdlib) keeps the mapping deterministic and is faster than SHA-256
+    h = hashlib.blake2b(s.encode(), digest_size=_B62_DIGEST_SIZE).digest()
     # convert to a big integer
     num = int.from_bytes(h, 'big')
     
-    # map directly to base62 with the requested length
-    out = []
-    for _ in range(length):
-        num, r = divmod(num, 62)
-        out.append(BASE62[r])
+    # map directly to base62 with the requested length, two digits per divmod
+    out = bytearray(length)
+    for i in range(0, length - 1, 2):
+        num, r = divmod(num, 3844)
+        out[i:i + 2] = _BASE62_PAIRS[r]
+    if length % 2:
+        out[-1] = _BASE62_B[num % 62]
     
-    return "".join(out)
\ No newline at end of file
+    return out.decode('ascii')
+
+
+_b62_batch_kernel = None
+
+def _get_b62_batch_kernel():
+    """Import numba and JIT the batch kernel on first use; None if numba fails to import."""
+    global _b62_batch_kernel, _HAS_NUMBA
+    if _b62_batch_kernel is not None:
+        return _b62_batch_kernel
+    try:
+        from numba import njit, prange
+    except ImportError:
+        _HAS_NUMBA = False
+        return None
+
+    @njit(parallel=True, cache=True)
+    def kernel(num, length, alphabet, out):
+        """
+        Native base62 digit extraction: long division of each row of `num`
+        (big-endian base 256, modified in place) by 62, one digit per pass.
+        """
+        n, nbytes = num.shape
+        for k in prange(n):
+            start = 0
+            for i in range(length):
+                # leading zero bytes stay zero, skip them
+                while start < nbytes and num[k, start] == 0:
+                    start += 1
+                rem = 0
+                for j in range(start, nbytes):
+                    cur = rem * 256 + num[k, j]
+                    q = cur // 62
+                    num[k, j] = q
+                    rem = cur - q * 62
+                out[k, i] = alphabet[rem]
+
+    _b62_batch_kernel = kernel
+    return kernel
+
+
+def str2base62_batch(strings: Iterable[str], length: int = 8) -> List[str]:
+    """
+    Vectorized str2base62 over many strings; returns the same values as calling
+    str2base62 on each one. Digests are stacked into an (N, nbytes) uint8 array and
+    base62 digits are extracted by byte-wise long division, vectorized over N
+    (or JIT-compiled with numba when available).
+    """
+    nbytes = _B62_DIGEST_SIZE
+    data = b''.join(hashlib.blake2b(s.encode(), digest_size=nbytes).digest() for s in strings)
+    digests = np.frombuffer(data, dtype=np.uint8).reshape(-1, nbytes)
+    n = digests.shape[0]
+    if n == 0 or length == 0:
+        return [''] * n
+
+    kernel = _get_b62_batch_kernel() if _HAS_NUMBA else None
+    if kernel is not None:
+        chars = np.empty((n, length), dtype=np.uint8)
+        kernel(digests.copy(), length, np.frombuffer(_BASE62_B, dtype=np.uint8), chars)
+        buf = chars.tobytes().decode('ascii')
+        return [buf[i * length:(i + 1) * length] for i in range(n)]
+
+    num = digests.astype(np.int32)
+
+    # long division of each row (big-endian base 256) by 62**2, two digits per pass
+    digits = np.empty((n, length), dtype=np.uint8)
+    for i in range(0, length, 2):
+        rem = np.zeros(n, dtype=np.int32)
+        for j in range(nbytes):
+            cur = rem * 256 + num[:, j]
+            num[:, j] = cur // 3844
+            rem = cur - num[:, j] * 3844
+        digits[:, i] = rem % 62
+        if i + 1 < length:
+            digits[:, i + 1] = rem // 62
+
+    chars = np.frombuffer(_BASE62_B, dtype=np.uint8)[digits]
+    buf = chars.tobytes().decode('ascii')
+    return [buf[i * length:(i + 1) * length] for i in range(n)]
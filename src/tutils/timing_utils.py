@@ -1,29 +1,53 @@
-# utilitybox/timing.py
+# tutils/timing_utils.py
 from __future__ import annotations
 import time
-from typing import Optional, List, Dict, Any, Tuple
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+
+_PC_NS = time.perf_counter_ns  # bound once: skips the module attribute lookup per timing point
+
+# one finished segment; much smaller than a {"name", "seconds"} dict
+Segment = namedtuple("Segment", ("name", "seconds"))
+
+# (upper bound in seconds, scale, format); anything larger is shown in seconds
+_UNITS = (
+    (1e-6, 1e9, "{:.1f} ns"),
+    (1e-3, 1e6, "{:.1f} µs"),
+    (1,    1e3, "{:.2f} ms"),
+)
 
 def _fmt(sec: float) -> str:
-    if sec < 1e-6: return f"{sec*1e9:.1f} ns"
-    if sec < 1e-3: return f"{sec*1e6:.1f} µs"
-    if sec < 1:   return f"{sec*1e3:.2f} ms"
+    for lim, mul, fmt in _UNITS:
+        if sec < lim:
+            return fmt.format(sec * mul)
     return f"{sec:.3f} s"
 
 class Timer:
     """
     Manual, segment-based timer:
-      - You call start(name) / end(name) explicitly.
+      - You call start(name) / end(name) explicitly, or use `with timer.segment(name):`.
       - name is just a tag; reusing the same name creates a new record.
       - No auto-chaining or aggregation.
 
     Best for cases where you already have clear start/end hooks and only need
     to measure each segment.
+
+    With cuda=True (and CUDA available) segments are timed with CUDA events on the
+    current stream instead of synchronizing the whole device at every start/end.
     """
 
+    __slots__ = (
+        "cuda", "logger", "_running", "_curr_name", "_t0_ns", "_names", "_spans_ns",
+        "_elapsed_ns_total", "_use_events", "_event_cls", "_start_evt", "_pending",
+        "_records_cache",
+    )
+
     def __init__(
         self,
         *,
-        cuda: bool = False,         # whether to do torch.cuda.synchronize() at the timing point
+        cuda: bool = False,         # time segments with CUDA events (GPU time) instead of host wall-clock
         logger: Optional[Any] = None, # optional logging.Logger; only used when you manually log
     ) -> None:
         self.cuda = cuda
@@ -31,19 +55,45 @@ class Timer:
         self._running: bool = False
         self._curr_name: Optional[str] = None
         self._t0_ns: Optional[int] = None
-        self._records: List[Dict[str, Any]] = []  # [{'name': str, 'seconds': float}]
+        # records as parallel arrays (segment name, duration in ns); Segments are built on demand
+        self._names: List[str] = []
+        self._spans_ns: array = array('q')
+        self._records_cache: Optional[List[Segment]] = None  # built by `records`, dropped on change
         self._elapsed_ns_total: int = 0
+        # CUDA events only record into the stream; no device-wide synchronize on start/end
+        self._use_events: bool = False
+        self._event_cls: Optional[Any] = None  # torch.cuda.Event, resolved once here
+        self._start_evt: Optional[Any] = None
+        self._pending: List[Tuple[str, Any, Any]] = []  # [(name, start_evt, end_evt)] not yet resolved
+        if cuda:
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    self._event_cls = torch.cuda.Event
+                    self._use_events = True
+            except Exception:
+                pass  # do not fail due to CUDA issues
 
     # ---- internals ----
-    def _sync_cuda(self) -> None:
-        if not self.cuda:
+    def _record_event(self) -> Any:
+        evt = self._event_cls(enable_timing=True)
+        evt.record()
+        return evt
+
+    def _resolve(self) -> None:
+        """Turn pending CUDA event pairs into records."""
+        if not self._pending:
             return
-        try:
-            import torch
-            if torch.cuda.is_available():
-                torch.cuda.synchronize()
-        except Exception:
-            pass  # do not fail due to CUDA issues
+        # on a single stream the first wait drains the queue and later ones return at once;
+        # waiting on every end event keeps this correct when segments ran on other streams
+        for name, start_evt, end_evt in self._pending:
+            end_evt.synchronize()
+            span_ns = int(start_evt.elapsed_time(end_evt) * 1e6)  # ms -> ns
+            self._elapsed_ns_total += span_ns
+            self._names.append(name)
+            self._spans_ns.append(span_ns)
+        self._pending.clear()
+        self._records_cache = None
 
     # ---- API ----
     def start(self, name: str) -> None:
@@ -55,43 +105,88 @@ class Timer:
             raise RuntimeError("SegmentTimer.start(): a segment is already running. Call end() first.")
         if not name:
             raise ValueError("SegmentTimer.start(): name must be a non-empty string.")
-        self._sync_cuda()
         self._curr_name = name
-        self._t0_ns = time.perf_counter_ns()
+        if self._use_events:
+            self._start_evt = self._record_event()
+        else:
+            self._t0_ns = _PC_NS()
         self._running = True
 
     def end(self, name: Optional[str] = None) -> float:
         """
         Stop the current segment and return its duration in seconds.
         If `name` is provided, validate it matches the name used at start.
+        With CUDA events the duration is not known yet and NaN is returned; it is
+        resolved lazily (in one pass over all pending segments) on records/total_seconds/report().
         """
         if not self._running:
             raise RuntimeError("SegmentTimer.end(): no segment is running. Did you call start()?")
         if name is not None and name != self._curr_name:
             raise ValueError(f"SegmentTimer.end(): name mismatch. started='{self._curr_name}', ended='{name}'")
-        self._sync_cuda()
-        t1 = time.perf_counter_ns()
-        span_ns = t1 - (self._t0_ns or t1)
-        span_s = span_ns / 1e9
-
-        # accumulate total time; same-name segments are just appended
-        self._elapsed_ns_total += span_ns
-        self._records.append({"name": self._curr_name, "seconds": span_s})
+        if self._use_events:
+            # async: keep the events, resolve later in _resolve()
+            self._pending.append((self._curr_name, self._start_evt, self._record_event()))
+            span_s = float("nan")
+        else:
+            t1 = _PC_NS()
+            span_ns = t1 - (self._t0_ns or t1)
+            span_s = span_ns / 1e9
+
+            # accumulate total time; same-name segments are just appended
+            self._elapsed_ns_total += span_ns
+            self._names.append(self._curr_name)
+            self._spans_ns.append(span_ns)
+            self._records_cache = None
 
         # clear running state
         self._running = False
         self._curr_name = None
         self._t0_ns = None
+        self._start_evt = None
         return span_s
 
+    @contextmanager
+    def segment(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block as a segment named `name`:
+            with timer.segment("load"):
+                ...
+        Bypasses the start()/end() running state, so it may be nested inside other
+        segments; the record is added when the block exits. Nested segments overlap
+        their parent, so their time also counts towards total_seconds and the report's Total.
+        """
+        if self._use_events:
+            start_evt = self._record_event()
+            try:
+                yield
+            finally:
+                self._pending.append((name, start_evt, self._record_event()))
+        else:
+            t0 = _PC_NS()
+            try:
+                yield
+            finally:
+                span_ns = _PC_NS() - t0
+                self._elapsed_ns_total += span_ns
+                self._names.append(name)
+                self._spans_ns.append(span_ns)
+                self._records_cache = None
+
     def reset(self, *, clear_records: bool = True) -> None:
         """Reset timer state; optionally clear history."""
         self._running = False
         self._curr_name = None
         self._t0_ns = None
-        self._elapsed_ns_total = 0
+        self._start_evt = None
         if clear_records:
-            self._records.clear()
+            self._pending.clear()
+            self._names.clear()
+            self._spans_ns = array('q')
+            self._records_cache = None
+        else:
+            # keep ended-but-unresolved CUDA segments as records, like the CPU path does
+            self._resolve()
+        self._elapsed_ns_total = 0
 
     # ---- properties & export ----
     @property
@@ -105,30 +200,43 @@ class Timer:
     @property
     def total_seconds(self) -> float:
         """
-        Total duration of all completed segments (excludes a running one).
+        Sum of the durations of all completed segments (excludes a running one).
+        Overlapping segments (nested segment() blocks) are each counted in full,
+        so this can exceed the wall-clock time covered.
         """
+        self._resolve()
         return self._elapsed_ns_total / 1e9
 
     @property
-    def records(self) -> List[Dict[str, Any]]:
+    def records(self) -> List[Segment]:
         """
-        Return all segment records in time order.
-        Example: [{"name":"load","seconds":0.123}, {"name":"train","seconds":2.5}, {"name":"load","seconds":0.110}]
+        Return all segment records in time order, as Segment(name, seconds) tuples.
+        Example: [Segment(name='load', seconds=0.123), Segment(name='train', seconds=2.5)]
+        The list is cached until the next segment ends; treat it as read-only
+        and use snapshot() if you need a copy to keep or modify.
         """
-        return list(self._records)
+        self._resolve()
+        if self._records_cache is None:
+            self._records_cache = [Segment(n, ns / 1e9) for n, ns in zip(self._names, self._spans_ns)]
+        return self._records_cache
+
+    def snapshot(self) -> List[Segment]:
+        """Independent copy of the current records."""
+        return list(self.records)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
             "total_seconds": self.total_seconds,
-            "records": self.records,
+            "records": [r._asdict() for r in self.records],  # plain dicts for serialization
         }
 
     def report(self) -> str:
+        self._resolve()
         lines = [f"Total: {_fmt(self.total_seconds)}"]
-        if self._records:
+        if self._names:
             lines.append("Segments:")
-            for i, r in enumerate(self._records, 1):
-                lines.append(f"  #{i:02d} {r['name']}: {_fmt(r['seconds'])}")
+            lines.extend([f"  #{i:02d} {n}: {_fmt(ns / 1e9)}"
+                          for i, (n, ns) in enumerate(zip(self._names, self._spans_ns), 1)])
         if self._running and self._curr_name:
             lines.append(f"* still running: {self._curr_name}")
         return "\n".join(lines)
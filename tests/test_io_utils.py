@@ -0,0 +1,137 @@
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from tutils.io_utils import dump_jsonl, load_jsonl, transform_jsonl
+
+
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_jsonl_roundtrip_nonfinite(tmp_path, ensure_ascii):
+    p = tmp_path / "data.jsonl"
+    data = [
+        {"n": float("nan"), "i": float("inf"), "j": -float("inf"), "none": None},
+        {"s": np.float32("nan"), "a": np.array([1.0, np.inf])},
+    ]
+    dump_jsonl(p, data, ensure_ascii=ensure_ascii)
+    a, b = load_jsonl(p)
+    assert math.isnan(a["n"]) and a["i"] == math.inf and a["j"] == -math.inf and a["none"] is None
+    assert math.isnan(b["s"]) and b["a"] == [1.0, math.inf]
+
+
+@pytest.mark.parametrize("v", [2**63 - 1, -2**63, 2**64 - 1, 2**64, -2**63 - 1, 10**30, -10**30])
+def test_jsonl_roundtrip_int_boundaries(tmp_path, v):
+    p = tmp_path / "data.jsonl"
+    dump_jsonl(p, [{"v": v}])
+    (out,) = load_jsonl(p)
+    assert type(out["v"]) is int and out["v"] == v
+
+
+def test_transform_jsonl_keeps_nonfinite(tmp_path):
+    p = tmp_path / "data.jsonl"
+    dump_jsonl(p, [{"x": 1.0}, {"x": float("nan")}])
+    transform_jsonl(str(p), _add_inf)
+    a, b = load_jsonl(p)
+    assert a == {"x": 1.0, "y": math.inf}
+    assert math.isnan(b["x"]) and b["y"] == math.inf
+
+
+def _add_inf(d):
+    d["y"] = float("inf")
+    return d
+
+
+_CRASH_MOD = '''
+import os
+
+def mark(d):
+    if d["i"] == 5 and os.environ.get("CRASH"):
+        os._exit(1)
+    d["tag"] = d["i"] in {1, 3, "a", "b"}
+    return d
+
+def other(d):
+    d["tag"] = "other"
+    return d
+'''
+
+
+def _run(tmp_path, code, **env):
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(tmp_path)] + sys.path), **env}
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+
+
+@pytest.fixture
+def crashed(tmp_path, monkeypatch):
+    """A 10-line jsonl file whose transform_jsonl(mark, interval=0) run died at line 6."""
+    (tmp_path / "crashmod.py").write_text(_CRASH_MOD)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "crashmod", raising=False)
+    p = tmp_path / "data.jsonl"
+    dump_jsonl(p, [{"i": i} for i in range(10)])
+    code = f"from crashmod import mark; from tutils.io_utils import transform_jsonl; transform_jsonl({str(p)!r}, mark, interval=0)"
+    r = _run(tmp_path, code, CRASH="1")
+    assert r.returncode == 1, r.stderr
+    assert load_jsonl(p) == [{"i": i} for i in range(10)]
+    return str(p)
+
+
+def test_transform_jsonl_resumes_after_crash(crashed, capsys):
+    from crashmod import mark
+    transform_jsonl(crashed, mark, interval=0)
+    assert "Resume from checkpoint: 5 / 10" in capsys.readouterr().out
+    assert load_jsonl(crashed) == [{"i": i, "tag": i in (1, 3)} for i in range(10)]
+    assert not any(os.path.exists(crashed + ext) for ext in (".tmp", ".ckpt"))
+
+
+def test_transform_jsonl_fresh_start_on_other_func(crashed, capsys):
+    from crashmod import other
+    transform_jsonl(crashed, other, interval=0)
+    assert "different source file or transform_func" in capsys.readouterr().out
+    assert load_jsonl(crashed) == [{"i": i, "tag": "other"} for i in range(10)]
+
+
+def test_transform_jsonl_fresh_start_on_changed_source(crashed, capsys):
+    from crashmod import mark
+    with open(crashed, "ab") as f:
+        f.write(b'{"i": 10}\n')
+    transform_jsonl(crashed, mark, interval=0)
+    assert "different source file or transform_func" in capsys.readouterr().out
+    assert load_jsonl(crashed) == [{"i": i, "tag": i in (1, 3)} for i in range(11)]
+
+
+def test_transform_jsonl_fresh_start_on_short_temp(crashed, capsys):
+    from crashmod import mark
+    with open(crashed + ".tmp", "r+b") as f:
+        f.truncate(3)
+    transform_jsonl(crashed, mark, interval=0)
+    assert "shorter than the checkpoint" in capsys.readouterr().out
+    assert load_jsonl(crashed) == [{"i": i, "tag": i in (1, 3)} for i in range(10)]
+
+
+def test_func_fingerprint_ignores_hash_seed(tmp_path):
+    (tmp_path / "crashmod.py").write_text(_CRASH_MOD)
+    code = "from crashmod import mark; from tutils.io_utils import _func_fingerprint; print(_func_fingerprint(mark))"
+    outs = {_run(tmp_path, code, PYTHONHASHSEED=str(seed)).stdout for seed in (1, 2, 3)}
+    assert len(outs) == 1 and outs != {""}
+
+
+def _square(d):
+    if d["i"] % 7 == 0:
+        return None
+    d["sq"] = d["i"] ** 2
+    return d
+
+
+def test_transform_jsonl_workers_match_sequential(tmp_path):
+    data = [{"i": i} for i in range(100)]
+    seq, par = tmp_path / "seq.jsonl", tmp_path / "par.jsonl"
+    dump_jsonl(seq, data)
+    dump_jsonl(par, data)
+    transform_jsonl(str(seq), _square)
+    transform_jsonl(str(par), _square, num_workers=2, chunksize=8)
+    assert seq.read_bytes() == par.read_bytes()
+    assert len(load_jsonl(par)) == 85
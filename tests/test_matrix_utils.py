@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from tutils import matrix_utils
+from tutils.matrix_utils import maxp_matrix, topk_matrix
+
+
+def test_topk_approximate_returns_k_with_partial_chunk():
+    a = np.random.default_rng(0).random((1, 65537))
+    assert len(topk_matrix(a, 4, approximate=True)) == 4
+
+
+def test_topk_approximate_exact_when_k_prime_covers_k():
+    a = np.random.default_rng(1).random((100, 101))
+    assert topk_matrix(a, 20, approximate=True, k_prime=20, chunk_size=512) == topk_matrix(a, 20)
+
+
+def test_topk_approximate_bool_matrix():
+    a = np.zeros((300, 300), dtype=bool)
+    a[7, 9] = True
+    assert topk_matrix(a, 1, approximate=True, chunk_size=1000) == [(7, 9)]
+
+
+@pytest.mark.skipif(not matrix_utils._HAS_NUMBA, reason="numba not installed")
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_maxp_numba_matches_numpy(monkeypatch, dtype):
+    monkeypatch.setattr(matrix_utils, "_NUMBA_MIN_SIZE", 0)
+    rng = np.random.default_rng(2)
+    cases = [np.array([[1.0, 0.1, 0.5]], dtype), rng.standard_normal((50, 70)).astype(dtype)]
+    for a in cases:
+        for percent in (0.1, 0.5, 0.9):
+            fast = maxp_matrix(a, percent)
+            monkeypatch.setattr(matrix_utils, "_HAS_NUMBA", False)
+            ref = maxp_matrix(a, percent)
+            monkeypatch.setattr(matrix_utils, "_HAS_NUMBA", True)
+            assert fast == ref